@@ -2,9 +2,19 @@
 # SALES ANALYTICS DASHBOARD – GITHUB AUTO-LOAD (SAFE MODE)
 # =============================================================================
 
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import requests
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # ---------------------------------------------------------------------------
 # PAGE CONFIG
@@ -15,123 +25,334 @@ st.set_page_config(
 )
 
 # ---------------------------------------------------------------------------
-# GITHUB RAW FILE URLS
+# GITHUB FILE URLS (served through the jsDelivr CDN)
 # ---------------------------------------------------------------------------
-# Replace these with your actual GitHub raw file URLs
+# Replace these with your actual repository files:
+# https://cdn.jsdelivr.net/gh/<user>/<repo>@<ref>/<file>
+# jsDelivr caches branch refs such as @main at the edge for up to ~12 hours, so
+# a push is not visible (and the ETag check keeps seeing the old file) until
+# then. After pushing new extracts either purge each file via
+# https://purge.jsdelivr.net/gh/<user>/<repo>@main/<file>, or pin DATA_REF to
+# the new commit SHA or tag, which is served fresh immediately.
+# Parquet snapshots are produced by export_parquet.py; when a snapshot is not
+# published the loader falls back to the .xlsx file of the same name.
+DATA_REF = "main"
+DATA_BASE_URL = f"https://cdn.jsdelivr.net/gh/tobeezr/repo@{DATA_REF}"
 GITHUB_FILES = {
-    "sales": "https://raw.githubusercontent.com/tobeezr/repo/main/sales_analysis_results.xlsx",
-    "sku": "https://raw.githubusercontent.com/tobeezr/repo/main/sku_analysis.xlsx",
-    "client": "https://raw.githubusercontent.com/tobeezr/repo/main/client_status_analysis.xlsx",
-    "advanced": "https://raw.githubusercontent.com/tobeezr/repo/main/advanced_sales_insights.xlsx",
+    "sales": f"{DATA_BASE_URL}/sales_analysis_results.parquet",
+    "sku": f"{DATA_BASE_URL}/sku_analysis.parquet",
+    "client": f"{DATA_BASE_URL}/client_status_analysis.parquet",
+    "advanced": f"{DATA_BASE_URL}/advanced_sales_insights.parquet",
 }
 
+# Overview scalars precomputed by export_parquet.py
+GITHUB_FILES_SUMMARY = f"{DATA_BASE_URL}/summary.json"
+SUMMARY_KEYS = ("total_revenue", "sales_rows", "active_clients")
+
+# Line charts are downsampled to at most this many points before plotting
+MAX_TREND_POINTS = 2000
+
+# Sheets shorter than this don't show the trend chart unless asked to
+MIN_TREND_ROWS = 50
+
+# Read-only charts skip Plotly.js's hover/zoom layer and mode bar
+STATIC_PLOT_CONFIG = {"staticPlot": True, "displayModeBar": False}
+
+# On-disk copy of each loaded frame, keyed by source URL, ETag and
+# CACHE_VERSION, so a restarted worker can skip the download and parse while
+# the file is unchanged. Only the newest version of each source is kept.
+CACHE_DIR = Path(tempfile.gettempdir()) / "dash_cache"
+
+# Bump whenever load_excel_from_github changes what it stores (column names,
+# dtypes), so frames cleaned by the old code are not served from disk
+CACHE_VERSION = 1
+
 # ---------------------------------------------------------------------------
 # SAFE LOAD FUNCTION
 # ---------------------------------------------------------------------------
-@st.cache_data
+# One session per process, so concurrent loads and reruns reuse keep-alive
+# connections instead of opening a new pool on every widget interaction
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=len(GITHUB_FILES)))
+    return session
+
+def resolve_source(url):
+    """Return (url, etag) of the Parquet snapshot, or of the xlsx fallback."""
+    xlsx_url = url.removesuffix(".parquet") + ".xlsx"
+    for candidate in (url, xlsx_url):
+        try:
+            response = get_session().head(candidate, timeout=10, allow_redirects=True)
+        except requests.RequestException:
+            continue
+        if response.ok:
+            return candidate, response.headers.get("ETag")
+    return xlsx_url, None
+
+def read_source(url):
+    # Stream to a temp file so the whole download is never held in memory
+    suffix = Path(url).suffix
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        path = tmp.name
+    try:
+        with get_session().get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(path, "wb") as out:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    out.write(chunk)
+        if suffix == ".parquet":
+            return pd.read_parquet(path, engine="pyarrow")
+        return pd.read_excel(path, engine="calamine")
+    finally:
+        os.remove(path)
+
+def disk_cache_file(source, etag):
+    # <source key>_<version>: older versions of a source, including files
+    # written under an earlier CACHE_VERSION, share the prefix and get pruned
+    prefix = hashlib.sha1(source.encode()).hexdigest()
+    version = hashlib.sha1(f"{CACHE_VERSION}|{etag}".encode()).hexdigest()[:16]
+    return CACHE_DIR / f"{prefix}_{version}.parquet"
+
+def read_disk_cache(cache_file):
+    if not cache_file.exists():
+        return None
+    try:
+        return pd.read_parquet(cache_file, engine="pyarrow")
+    except Exception:
+        # Damaged file: drop it so the caller reloads from the source
+        cache_file.unlink(missing_ok=True)
+        return None
+
+def write_disk_cache(cache_file, df):
+    # Best-effort: write a temp file and rename it into place, so a killed or
+    # out-of-disk write never leaves a truncated cache file behind
+    tmp_path = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix=".tmp", delete=False) as tmp:
+            tmp_path = tmp.name
+        df.to_parquet(tmp_path, engine="pyarrow")
+        os.replace(tmp_path, cache_file)
+        prefix = cache_file.name.split("_")[0]
+        for stale in CACHE_DIR.glob(f"{prefix}_*.parquet"):
+            if stale != cache_file:
+                stale.unlink(missing_ok=True)
+    except Exception:
+        if tmp_path:
+            Path(tmp_path).unlink(missing_ok=True)
+
+# cache_resource hands back the same frame without a pickle round-trip per
+# access; callers must treat it as read-only. TTL makes the app re-check the
+# CDN hourly (see DATA_REF for CDN-side staleness), max_entries bounds the
+# process's memory.
+@st.cache_resource(ttl=3600, max_entries=8)
 def load_excel_from_github(url):
     try:
-        df = pd.read_excel(url)
+        source, etag = resolve_source(url)
+        cache_file = disk_cache_file(source, etag) if etag else None
+        if cache_file:
+            df = read_disk_cache(cache_file)
+            if df is not None:
+                return df
+        df = read_source(source)
         # Clean column names
-        df.columns = (
-            df.columns.str.strip()
-            .str.upper()
-            .str.replace(" ", "_")
-            .str.replace("-", "_")
-        )
+        df.columns = [
+            str(c).strip().upper().replace(" ", "_").replace("-", "_")
+            for c in df.columns
+        ]
+        # Text columns become category when their values mostly repeat
+        for col in df.select_dtypes(include=["object", "string"]).columns:
+            if df[col].nunique(dropna=False) / max(len(df), 1) < 0.5:
+                df[col] = df[col].astype("category")
+        # Downcast integers losslessly. Floats stay float64: float32 would
+        # change the values the tables show (6482.82 -> 6482.81982421875)
+        for col in df.select_dtypes("integer").columns:
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        if cache_file:
+            write_disk_cache(cache_file, df)
         return df
     except Exception:
         return pd.DataFrame()
 
-# ---------------------------------------------------------------------------
-# LOAD DATA
-# ---------------------------------------------------------------------------
-df_sales = load_excel_from_github(GITHUB_FILES["sales"])
-df_sku = load_excel_from_github(GITHUB_FILES["sku"])
-df_client = load_excel_from_github(GITHUB_FILES["client"])
-df_advanced = load_excel_from_github(GITHUB_FILES["advanced"])
+@st.cache_data(ttl=3600)
+def load_summary():
+    try:
+        response = get_session().get(GITHUB_FILES_SUMMARY, timeout=10)
+        response.raise_for_status()
+        summary = response.json()
+        return {key: summary[key] for key in SUMMARY_KEYS}
+    except Exception:
+        return None
+
+def load_many(*keys):
+    """Load several workbooks concurrently; each load is I/O-bound."""
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=len(keys), initializer=add_script_run_ctx, initargs=(None, ctx)
+    ) as executor:
+        return list(executor.map(lambda key: load_excel_from_github(GITHUB_FILES[key]), keys))
 
 # ---------------------------------------------------------------------------
-# SIDEBAR NAVIGATION
+# DISPLAY HELPERS
 # ---------------------------------------------------------------------------
-st.sidebar.title("📊 Navigation")
-st.sidebar.info("Data source: GitHub (Colab extracts)")
+def numeric_total(df):
+    """Sum every numeric column in place, without building a numeric-only copy."""
+    # np.nansum over each column's contiguous array, accumulating in float64
+    # so downcast int8/int16 columns can't overflow
+    return float(sum(
+        np.nansum(df[col].to_numpy(), dtype=np.float64)
+        for col, dtype in df.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ))
 
-section = st.sidebar.radio(
-    "Select section",
-    [
-        "Overview",
-        "Sales Performance",
-        "SKU Analysis",
-        "Client Status",
-        "Advanced Insights",
-    ]
-)
+def show_table(df, max_rows):
+    """Send at most max_rows to the browser instead of the whole frame."""
+    st.dataframe(df.head(max_rows), use_container_width=True)
+    if len(df) > max_rows:
+        st.caption(f"Showing {max_rows:,} of {len(df):,} rows")
+
+def lttb_indices(y, n_out):
+    """Largest-Triangle-Three-Buckets: positions of n_out points that keep the line's shape."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = (end + next_end - 1) / 2
+        avg_y = y[end:next_end].mean()
+        xs = np.arange(start, end)
+        area = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+# Figures are cached per (frame contents, args) so reruns and section switches
+# reuse them instead of rebuilding through Plotly Express
+@st.cache_resource(ttl=3600, max_entries=8)
+def sales_trend_fig(df, y):
+    trend = df.iloc[lttb_indices(df[y], MAX_TREND_POINTS)]
+    return px.line(trend, y=y, title="Sales Trend", render_mode="webgl")
+
+@st.cache_resource(ttl=3600, max_entries=8)
+def client_pie_fig(df):
+    status_counts = (
+        df["CLIENT_STATUS"]
+        .value_counts()
+        .rename_axis("CLIENT_STATUS")
+        .reset_index(name="COUNT")
+    )
+    return px.pie(
+        status_counts,
+        names="CLIENT_STATUS",
+        values="COUNT",
+        title="Client Distribution",
+    )
 
 # ---------------------------------------------------------------------------
-# OVERVIEW
+# SECTIONS
 # ---------------------------------------------------------------------------
-if section == "Overview":
+# Each section is a fragment, so its own widgets rerun only that section.
+# Workbooks are loaded inside the section that needs them; the cache keeps
+# revisits free.
+@st.fragment
+def overview_section(max_rows, plot_config):
     st.title("📈 Overview")
+    summary = load_summary()
 
-    if df_sales.empty:
-        st.warning("No sales data available")
-    else:
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Revenue", f"{df_sales.select_dtypes('number').sum().sum():,.0f}")
-        col2.metric("Rows", len(df_sales))
-        col3.metric("Active Clients", len(df_client) if not df_client.empty else 0)
+    if summary is None:
+        # No published summary: compute it from the workbooks
+        df_sales, df_client = load_many("sales", "client")
+        if df_sales.empty:
+            st.warning("No sales data available")
+            return
+        summary = {
+            "total_revenue": numeric_total(df_sales),
+            "sales_rows": len(df_sales),
+            "active_clients": len(df_client) if not df_client.empty else 0,
+        }
 
-# ---------------------------------------------------------------------------
-# SALES PERFORMANCE
-# ---------------------------------------------------------------------------
-elif section == "Sales Performance":
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Revenue", f"{summary['total_revenue']:,.0f}")
+    col2.metric("Rows", summary["sales_rows"])
+    col3.metric("Active Clients", summary["active_clients"])
+
+@st.fragment
+def sales_section(max_rows, plot_config):
     st.title("💰 Sales Performance")
+    df_sales = load_excel_from_github(GITHUB_FILES["sales"])
 
     if df_sales.empty:
         st.warning("No sales data available")
     else:
-        st.dataframe(df_sales, use_container_width=True)
+        show_table(df_sales, max_rows)
         numeric_cols = df_sales.select_dtypes("number").columns
         if len(numeric_cols) >= 1:
-            fig = px.line(df_sales, y=numeric_cols[0], title="Sales Trend")
-            st.plotly_chart(fig, use_container_width=True)
+            if st.checkbox("Show trend chart", value=len(df_sales) > MIN_TREND_ROWS):
+                fig = sales_trend_fig(df_sales, numeric_cols[0])
+                st.plotly_chart(fig, use_container_width=True, theme=None, config=plot_config)
 
-# ---------------------------------------------------------------------------
-# SKU ANALYSIS
-# ---------------------------------------------------------------------------
-elif section == "SKU Analysis":
+@st.fragment
+def sku_section(max_rows, plot_config):
     st.title("📦 SKU Analysis")
+    df_sku = load_excel_from_github(GITHUB_FILES["sku"])
 
     if df_sku.empty:
         st.warning("No SKU data available")
     else:
-        st.dataframe(df_sku, use_container_width=True)
+        show_table(df_sku, max_rows)
 
-# ---------------------------------------------------------------------------
-# CLIENT STATUS
-# ---------------------------------------------------------------------------
-elif section == "Client Status":
+@st.fragment
+def client_section(max_rows, plot_config):
     st.title("👥 Client Status")
+    df_client = load_excel_from_github(GITHUB_FILES["client"])
 
     if df_client.empty:
         st.warning("No client status data available")
     else:
-        st.dataframe(df_client, use_container_width=True)
+        show_table(df_client, max_rows)
         if "CLIENT_STATUS" in df_client.columns:
-            fig = px.pie(df_client, names="CLIENT_STATUS", title="Client Distribution")
-            st.plotly_chart(fig, use_container_width=True)
+            fig = client_pie_fig(df_client)
+            st.plotly_chart(fig, use_container_width=True, config=plot_config)
 
-# ---------------------------------------------------------------------------
-# ADVANCED INSIGHTS
-# ---------------------------------------------------------------------------
-elif section == "Advanced Insights":
+@st.fragment
+def advanced_section(max_rows, plot_config):
     st.title("🚀 Advanced Insights")
+    df_advanced = load_excel_from_github(GITHUB_FILES["advanced"])
 
     if df_advanced.empty:
         st.warning("No advanced insights data available")
     else:
-        st.dataframe(df_advanced, use_container_width=True)
+        show_table(df_advanced, max_rows)
+
+SECTIONS = {
+    "Overview": overview_section,
+    "Sales Performance": sales_section,
+    "SKU Analysis": sku_section,
+    "Client Status": client_section,
+    "Advanced Insights": advanced_section,
+}
+
+# ---------------------------------------------------------------------------
+# SIDEBAR NAVIGATION
+# ---------------------------------------------------------------------------
+st.sidebar.title("📊 Navigation")
+st.sidebar.info("Data source: GitHub (Colab extracts)")
+
+section = st.sidebar.radio("Select section", list(SECTIONS))
+
+max_rows = st.sidebar.number_input("Rows to display", min_value=10, value=500, step=100)
+interactive = st.sidebar.checkbox("Interactive charts", value=False)
+plot_config = {} if interactive else STATIC_PLOT_CONFIG
+
+SECTIONS[section](max_rows, plot_config)
 
 # ---------------------------------------------------------------------------
 # FOOTER
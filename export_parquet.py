@@ -0,0 +1,58 @@
+# =============================================================================
+# EXPORT PARQUET SNAPSHOTS
+# =============================================================================
+# Converts the Colab workbooks into the Parquet snapshots read by app.py, and
+# writes summary.json with the Overview numbers when the sales and client
+# workbooks are among those exported. Run after each extract and commit the
+# output next to the .xlsx files:
+#
+#     python export_parquet.py                      # every *.xlsx in the cwd
+#     python export_parquet.py SKU_Analysis.xlsx    # specific workbooks
+
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+
+def export_parquet(path):
+    """Write the snapshot of one workbook; return (out path, frame)."""
+    path = Path(path)
+    # Lower-case stem to match the file names in GITHUB_FILES
+    out = path.with_name(path.stem.lower() + ".parquet")
+    df = pd.read_excel(path, engine="calamine")
+    df.columns = df.columns.astype(str)
+    df.to_parquet(out, engine="pyarrow", compression="zstd", index=False)
+    return out, df
+
+
+def export_summary(df_sales, df_client, out="summary.json"):
+    # Same figures the Overview computes when no summary is published
+    summary = {
+        "total_revenue": float(df_sales.select_dtypes("number").sum().sum()),
+        "sales_rows": len(df_sales),
+        "active_clients": len(df_client),
+    }
+    Path(out).write_text(json.dumps(summary, indent=2))
+    return out
+
+
+SALES_WORKBOOK = "Sales_Analysis_Results.xlsx"
+CLIENT_WORKBOOK = "Client_Status_Analysis.xlsx"
+
+
+if __name__ == "__main__":
+    workbooks = [Path(p) for p in sys.argv[1:]] or sorted(Path(".").glob("*.xlsx"))
+    # Keep the parsed frames so the summary doesn't read the workbooks again
+    frames = {}
+    for workbook in workbooks:
+        out, frames[workbook.name] = export_parquet(workbook)
+        print(f"{workbook} -> {out}")
+    by_name = {workbook.name: workbook for workbook in workbooks}
+    if SALES_WORKBOOK in frames and CLIENT_WORKBOOK in frames:
+        sales, client = by_name[SALES_WORKBOOK], by_name[CLIENT_WORKBOOK]
+        out = export_summary(
+            frames[SALES_WORKBOOK], frames[CLIENT_WORKBOOK], sales.with_name("summary.json")
+        )
+        print(f"{sales}, {client} -> {out}")